@@ -24,6 +24,14 @@ class QueryStatus:
     def send_fail(self, reason):
         LOG.error('QueryStatus Failed: %s' % reason)
 
+    def is_cancelled(self):
+        """Returns True if the caller has asked for the query to stop.
+
+        Sources should check this between long-running steps and return
+        early if set.
+        """
+        return False
+
 
 class NetworkResultRadio(chirp_common.NetworkSourceRadio):
     VENDOR = 'Query'
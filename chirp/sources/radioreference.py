@@ -146,6 +146,8 @@ class RadioReferenceRadio(base.NetworkResultRadio):
 
         for cat in county.cats:
             for subcat in cat.subcats:
+                if status.is_cancelled():
+                    return
                 result = self._client.service.getSubcatFreqs(subcat.scid,
                                                              self._auth)
                 self._freqs += result
@@ -160,6 +162,8 @@ class RadioReferenceRadio(base.NetworkResultRadio):
                 status_max += len(cat.subcats)
             for cat in agency.cats:
                 for subcat in cat.subcats:
+                    if status.is_cancelled():
+                        return
                     result = self._client.service.getSubcatFreqs(subcat.scid,
                                                                  self._auth)
                     self._freqs += result
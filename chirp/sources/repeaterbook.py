@@ -106,7 +106,8 @@ class RepeaterBook(base.NetworkResultRadio):
         if modified == 0:
             LOG.debug('RepeaterBook database %s not cached' % fn)
         else:
-            LOG.debug('RepeaterBook database %s too old: %s' % modified_dt)
+            LOG.debug('RepeaterBook database %s too old: %s' % (
+                fn, modified_dt))
         r = requests.get('https://www.repeaterbook.com/api/export.php',
                          params={'country': country,
                                  'state': state},
@@ -124,10 +125,17 @@ class RepeaterBook(base.NetworkResultRadio):
         data = b''
         with open(tmp, 'wb') as f:
             for chunk in r.iter_content(chunk_size=chunk_size):
+                if status.is_cancelled():
+                    break
                 f.write(chunk)
                 data += chunk
                 counter += len(chunk)
                 status.send_status('Downloading', counter / probable_end * 50)
+        if status.is_cancelled():
+            LOG.debug('RepeaterBook download cancelled')
+            r.close()
+            os.remove(tmp)
+            return
         try:
             results = json.loads(data)
         except Exception as e:
@@ -51,6 +51,12 @@ class ChirpConfig:
 
         return self.__config.get(section, key, raw=raw)
 
+    def get_section(self, section, raw=False):
+        if not self.__config.has_section(section):
+            return {}
+
+        return dict(self.__config.items(section, raw=raw))
+
     def set(self, key, value, section):
         if not self.__config.has_section(section):
             self.__config.add_section(section)
@@ -76,6 +82,10 @@ class ChirpConfigProxy:
         return self._config.get(key, section or self._section,
                                 raw=raw)
 
+    def get_section(self, section=None, raw=False):
+        """Return a snapshot of all options in a section as a dict"""
+        return self._config.get_section(section or self._section, raw=raw)
+
     def get_password(self, key, section):
         encoded = self.get(key, section)
         if encoded:
@@ -13,20 +13,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import functools
 import logging
-import queue
-import tempfile
+import re
 import threading
+import time
 import urllib
 
 import wx
 import wx.adv
 
 from chirp.sources import base
-from chirp.sources import dmrmarc
-from chirp.sources import mygmrs
-from chirp.sources import radioreference
-from chirp.sources import repeaterbook
 from chirp.wxui import common
 from chirp.wxui import config
 from chirp.wxui import fips
@@ -34,6 +32,24 @@ from chirp.wxui import fips
 CONF = config.get()
 LOG = logging.getLogger(__name__)
 QueryThreadEvent, EVT_QUERY_THREAD = wx.lib.newevent.NewCommandEvent()
+_GMRS_STATES = None
+_NUM_RE = re.compile(r'^\s*[-+]?(?:\d+(?:\.\d*)?|\.\d+)\s*\Z')
+_ZIP_RE = re.compile(r'^\d{5}\Z')
+
+
+@functools.lru_cache(maxsize=None)
+def _link_label(url):
+    return urllib.parse.urlparse(url).netloc
+
+
+def _gmrs_states():
+    """Return the sorted list of state names that have county data"""
+    global _GMRS_STATES
+    if _GMRS_STATES is None:
+        _GMRS_STATES = sorted(
+            name for name, code in fips.FIPS_STATES.items()
+            if isinstance(code, int) and code in fips.FIPS_COUNTIES)
+    return _GMRS_STATES
 
 
 class NumberValidator(wx.Validator):
@@ -42,45 +58,86 @@ class NumberValidator(wx.Validator):
     MAX = 1
     OPTIONAL = True
 
+    def __init__(self):
+        super().__init__()
+        self._watching = False
+        self._window_bg = None
+
+    def _normal_bg(self):
+        # Cached for the life of the dialog, which is short enough not to
+        # worry about the system colours changing underneath us
+        if self._window_bg is None:
+            self._window_bg = wx.SystemSettings.GetColour(
+                wx.SYS_COLOUR_WINDOW)
+        return self._window_bg
+
+    def _check(self, strvalue):
+        """Return an error message if strvalue is not valid, else None"""
+        if not strvalue and self.OPTIONAL:
+            return None
+        if not _NUM_RE.match(strvalue):
+            return _('Invalid %(value)s (use decimal degrees)')
+        elif not self.MIN <= float(strvalue) <= self.MAX:
+            return _('%(value)s must be between %(min)i and %(max)i')
+        return None
+
+    def _mark(self, textctrl, valid):
+        if valid:
+            # Only a field marked invalid needs repainting, and those are
+            # exactly the ones being watched
+            if self._watching:
+                self._clear(textctrl)
+            return
+        textctrl.SetBackgroundColour('pink')
+        # Clear the validation failure background color as soon as the value
+        # changes to avoid asking them to click OK on a dialog with a warning
+        # sign.
+        if not self._watching:
+            textctrl.Bind(wx.EVT_TEXT, self._colorchange)
+            self._watching = True
+
     def Validate(self, window):
         textctrl = self.GetWindow()
-        strvalue = textctrl.GetValue()
-        if not strvalue and self.OPTIONAL:
+        # The value may have changed without losing focus (e.g. by hitting
+        # enter), so re-check rather than trusting the last blur result
+        msg = self._check(textctrl.GetValue())
+        self._mark(textctrl, msg is None)
+        if msg is None:
             return True
-        try:
-            v = float(strvalue)
-            assert v >= self.MIN and v <= self.MAX
-            textctrl.SetBackgroundColour(
-                wx.SystemSettings.GetColour(wx.SYS_COLOUR_WINDOW))
-            return True
-        except ValueError:
-            msg = _('Invalid %(value)s (use decimal degrees)')
-        except AssertionError:
-            msg = _('%(value)s must be between %(min)i and %(max)i')
         textctrl.SetFocus()
-        textctrl.SetBackgroundColour('pink')
         catalog = {'value': self.THING,
                    'min': self.MIN,
                    'max': self.MAX}
         wx.MessageBox(msg % catalog, 'Invalid Entry')
         return False
 
+    def SetWindow(self, win):
+        super().SetWindow(win)
+        # Give immediate feedback when leaving the field, rather than
+        # waiting for them to click OK
+        win.Bind(wx.EVT_KILL_FOCUS, self._focus_lost)
+
+    def _focus_lost(self, event):
+        textctrl = self.GetWindow()
+        self._mark(textctrl, self._check(textctrl.GetValue()) is None)
+        event.Skip()
+
     def Clone(self):
         return self.__class__()
 
     def TransferToWindow(self):
         return True
 
-    def SetWindow(self, win):
-        super().SetWindow(win)
-        # Clear the validation failure background color as soon as the value
-        # changes to avoid asking them to click OK on a dialog with a warning
-        # sign.
-        win.Bind(wx.EVT_TEXT, self._colorchange)
+    def _clear(self, textctrl):
+        textctrl.SetBackgroundColour(self._normal_bg())
+        textctrl.Unbind(wx.EVT_TEXT, handler=self._colorchange)
+        self._watching = False
 
     def _colorchange(self, event):
-        self.GetWindow().SetBackgroundColour(
-            wx.SystemSettings.GetColour(wx.SYS_COLOUR_WINDOW))
+        # Only needed once after a failure, so stop watching until the next
+        # failed validation
+        self._clear(self.GetWindow())
+        event.Skip()
 
 
 class LatValidator(NumberValidator):
@@ -105,7 +162,7 @@ class ZipValidator(wx.Validator):
     def Validate(self, window):
         textctrl = self.GetWindow()
         strvalue = textctrl.GetValue()
-        if len(strvalue) == 5 and strvalue.isdigit():
+        if _ZIP_RE.match(strvalue):
             return True
         wx.MessageBox(_('Invalid ZIP code'), 'Invalid Entry')
         return False
@@ -119,28 +176,52 @@ class ZipValidator(wx.Validator):
 
 class QueryThread(threading.Thread, base.QueryStatus):
     END_SENTINEL = object()
+    # Minimum interval (in seconds) between repeated status updates with
+    # the same text and whole percentage, to avoid flooding the UI thread
+    STATUS_INTERVAL = 0.05
 
     def __init__(self, *a, **k):
         self.query_dialog = a[0]
         self.radio = a[1]
-        super(QueryThread, self).__init__(*a[2:], **k)
-        self.status_queue = queue.Queue()
+        self.params = a[2]
+        k.setdefault('daemon', True)
+        super(QueryThread, self).__init__(*a[3:], **k)
+        self.cancel_event = threading.Event()
+        self._last_post = 0.0
+        self._last_percent = -1
+        self._last_status = None
 
     def run(self):
         try:
-            self.radio.do_fetch(self, self.query_dialog.get_params())
+            self.radio.do_fetch(self, self.params)
         except Exception as e:
             LOG.exception('Failed to execute query: %s' % e)
             self.send_fail('Failed: %s' % str(e))
 
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
     def send_status(self, status, percent):
+        if self.is_cancelled():
+            return
+        now = time.monotonic()
+        whole = int(percent)
+        if (percent != 100 and whole == self._last_percent and
+                status == self._last_status and
+                now - self._last_post < self.STATUS_INTERVAL):
+            return
+        self._last_post = now
+        self._last_percent = whole
+        self._last_status = status
         self.query_dialog.status(status, percent)
 
     def send_end(self):
-        self.query_dialog.end()
+        if not self.is_cancelled():
+            self.query_dialog.end()
 
     def send_fail(self, reason):
-        self.query_dialog.fail(reason)
+        if not self.is_cancelled():
+            self.query_dialog.fail(reason)
 
 
 class QuerySourceDialog(wx.Dialog):
@@ -148,10 +229,18 @@ class QuerySourceDialog(wx.Dialog):
 
     def __init__(self, *a, **k):
         super(QuerySourceDialog, self).__init__(*a, **k)
+        # Suppress repaints while the widgets are built and laid out. This
+        # also covers the subclass build(), which happens inside here.
+        self.Freeze()
         self.result_radio = None
+        self._last_gauge = -1
+        self._last_label = None
+        self._pending = None
+        self._pending_scheduled = False
+        self._pending_lock = threading.Lock()
+        self._query_thread = None
 
         vbox = self.build()
-        self.Center()
 
         self.statusmsg = wx.StaticText(
             self, label='',
@@ -165,9 +254,9 @@ class QuerySourceDialog(wx.Dialog):
         vbox.Add(self.gauge, proportion=0, border=10,
                  flag=wx.EXPAND | wx.LEFT | wx.RIGHT)
 
-        link_label = urllib.parse.urlparse(self.get_link()).netloc
+        url = self.get_link()
         link = wx.adv.HyperlinkCtrl(vbox.GetContainingWindow(),
-                                    label=link_label, url=self.get_link(),
+                                    label=_link_label(url), url=url,
                                     style=wx.adv.HL_ALIGN_CENTRE)
         vbox.Insert(0, link, proportion=0, border=10,
                     flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM)
@@ -185,19 +274,22 @@ class QuerySourceDialog(wx.Dialog):
 
         self.SetMinSize((400, 200))
         self.Fit()
+        self.Thaw()
         wx.CallAfter(self.Center)
 
         vbox.GetContainingWindow().InitDialog()
 
-        self.result_file = tempfile.NamedTemporaryFile(
-            prefix='%s-' % self.NAME,
-            suffix='.csv').name
-
     def _call_validations(self, parent):
-        for child in parent.GetChildren():
-            if not child.Validate():
+        # Walk the window tree once, running each validator exactly once,
+        # in the same (tab) order as the widgets were created, so that the
+        # first invalid field is the one reported
+        stack = list(parent.GetChildren())[::-1]
+        while stack:
+            child = stack.pop()
+            validator = child.GetValidator()
+            if validator is not None and not validator.Validate(child):
                 return False
-            self._call_validations(child)
+            stack.extend(list(child.GetChildren())[::-1])
         return True
 
     def _button(self, event):
@@ -210,6 +302,8 @@ class QuerySourceDialog(wx.Dialog):
             self.do_query()
             return
 
+        if self._query_thread:
+            self._query_thread.cancel_event.set()
         self.EndModal(id)
 
     def build(self):
@@ -217,7 +311,11 @@ class QuerySourceDialog(wx.Dialog):
 
     def do_query(self):
         LOG.info('Starting QueryThread for %s' % self.result_radio)
-        QueryThread(self, self.result_radio).start()
+        # Collect the params here on the UI thread, as get_params() reads
+        # from the widgets
+        self._query_thread = QueryThread(self, self.result_radio,
+                                         self.get_params())
+        self._query_thread.start()
 
     def get_params(self):
         pass
@@ -229,8 +327,32 @@ class QuerySourceDialog(wx.Dialog):
         return ''
 
     def status(self, status, percent):
-        wx.PostEvent(self, QueryThreadEvent(self.GetId(),
-                                            status=status, percent=percent))
+        if percent == 100:
+            # Terminal updates are always delivered, and supersede
+            # anything still pending
+            with self._pending_lock:
+                self._pending = None
+            wx.PostEvent(self, QueryThreadEvent(self.GetId(),
+                                                status=status,
+                                                percent=percent))
+            return
+
+        # Keep only the latest intermediate update, and have at most one
+        # flush queued on the UI thread at a time
+        with self._pending_lock:
+            self._pending = (status, percent)
+            if self._pending_scheduled:
+                return
+            self._pending_scheduled = True
+        wx.CallAfter(self._flush_pending)
+
+    def _flush_pending(self):
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = None
+            self._pending_scheduled = False
+        if pending is not None:
+            self._show_status(*pending)
 
     def end(self):
         self.status(None, 100)
@@ -239,12 +361,19 @@ class QuerySourceDialog(wx.Dialog):
         self.status(reason, 100)
 
     def _got_status(self, event):
-        self.gauge.SetValue(int(event.percent))
-        if event.status is None:
+        self._show_status(event.status, event.percent)
+
+    def _show_status(self, status, percent):
+        # Skip no-op updates to avoid needless repaints
+        if int(percent) != self._last_gauge:
+            self._last_gauge = int(percent)
+            self.gauge.SetValue(self._last_gauge)
+        if status is None:
             self.EndModal(wx.ID_OK)
-        else:
-            self.statusmsg.SetLabel(event.status)
-        if event.percent == 100:
+        elif status != self._last_label:
+            self.statusmsg.SetLabel(status)
+            self._last_label = status
+        if percent == 100:
             self.FindWindowById(wx.ID_OK).Enable()
 
 
@@ -260,6 +389,8 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
         return 'https://repeaterbook.com'
 
     def build(self):
+        from chirp.sources import repeaterbook
+        self._rb = repeaterbook
         vbox = wx.BoxSizer(wx.VERTICAL)
         self.SetSizer(vbox)
         panel = wx.Panel(self)
@@ -269,9 +400,11 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
         grid.AddGrowableCol(1)
         panel.SetSizer(grid)
 
-        self._country = wx.Choice(panel, choices=repeaterbook.COUNTRIES)
-        prev = CONF.get('country', 'repeaterbook')
-        if prev and prev in repeaterbook.COUNTRIES:
+        cfg = CONF.get_section('repeaterbook', raw=True)
+
+        self._country = wx.Choice(panel, choices=self._rb.COUNTRIES)
+        prev = cfg.get('country')
+        if prev and prev in self._rb.COUNTRIES:
             self._country.SetStringSelection(prev)
         self._country.Bind(wx.EVT_CHOICE, self._state_selected)
         self._add_grid(grid, _('Country'), self._country)
@@ -281,13 +414,13 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
         self._add_grid(grid, _('State/Province'), self._state)
 
         self._lat = wx.TextCtrl(panel,
-                                value=CONF.get('lat', 'repeaterbook') or '',
+                                value=cfg.get('lat', ''),
                                 validator=LatValidator())
         self._lat.SetHint(_('Optional'))
         self._lat.SetToolTip(_('If set, sort results by distance from '
                                'these coordinates'))
         self._lon = wx.TextCtrl(panel,
-                                value=CONF.get('lon', 'repeaterbook') or '',
+                                value=cfg.get('lon', ''),
                                 validator=LonValidator())
         self._lon.SetHint(_('Optional'))
         self._lon.SetToolTip(_('If set, sort results by distance from '
@@ -296,7 +429,7 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
         self._add_grid(grid, _('Longitude'), self._lon)
 
         self._dist = wx.TextCtrl(panel,
-                                 value=CONF.get('dist', 'repeaterbook') or '',
+                                 value=cfg.get('dist', ''),
                                  validator=DistValidator())
         self._dist.SetHint(_('Optional'))
         self._dist.SetToolTip(_('Limit results to this distance (km) from '
@@ -308,7 +441,7 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
 
     def _state_selected(self, event):
         country = self._country.GetStringSelection()
-        states = repeaterbook.STATES[country]
+        states = self._rb.STATES[country]
         self._state.SetItems(states)
         prev = CONF.get('state', 'repeaterbook')
         if prev and prev in states:
@@ -325,7 +458,7 @@ class RepeaterBookQueryDialog(QuerySourceDialog):
         CONF.set('dist', self._dist.GetValue(), 'repeaterbook')
         CONF.set('state', self._state.GetStringSelection(), 'repeaterbook')
         CONF.set('country', self._country.GetStringSelection(), 'repeaterbook')
-        self.result_radio = repeaterbook.RepeaterBook()
+        self.result_radio = self._rb.RepeaterBook()
         super().do_query()
 
     def get_params(self):
@@ -365,6 +498,8 @@ class MyGMRSQueryDialog(QuerySourceDialog):
         grid.AddGrowableCol(1)
         panel.SetSizer(grid)
 
+        cfg = CONF.get_section('repeaterbook', raw=True)
+
         self._username = wx.TextCtrl(
                 panel,
                 value=CONF.get('username', 'mygmrs') or '')
@@ -374,10 +509,9 @@ class MyGMRSQueryDialog(QuerySourceDialog):
             value=CONF.get_password('password', 'mygmrs') or '')
         self._add_grid(grid, _('Password'), self._password)
 
-        states = [x for x, code in fips.FIPS_STATES.items()
-                  if isinstance(code, int) and code in fips.FIPS_COUNTIES]
-        self._state = wx.Choice(panel, choices=sorted(states))
-        prev = CONF.get('state', 'repeaterbook', 0)
+        states = _gmrs_states()
+        self._state = wx.Choice(panel, choices=states)
+        prev = cfg.get('state')
         if prev:
             try:
                 prev = fips.fips_to_state(prev)
@@ -387,13 +521,13 @@ class MyGMRSQueryDialog(QuerySourceDialog):
         self._add_grid(grid, _('State'), self._state)
 
         self._lat = wx.TextCtrl(panel,
-                                value=CONF.get('lat', 'repeaterbook') or '',
+                                value=cfg.get('lat', ''),
                                 validator=LatValidator())
         self._lat.SetHint(_('Optional'))
         self._lat.SetToolTip(_('If set, sort results by distance from '
                                'these coordinates'))
         self._lon = wx.TextCtrl(panel,
-                                value=CONF.get('lon', 'repeaterbook') or '',
+                                value=cfg.get('lon', ''),
                                 validator=LonValidator())
         self._lon.SetHint(_('Optional'))
         self._lon.SetToolTip(_('If set, sort results by distance from '
@@ -404,6 +538,7 @@ class MyGMRSQueryDialog(QuerySourceDialog):
         return vbox
 
     def do_query(self):
+        from chirp.sources import mygmrs
         CONF.set('state',
                  str(fips.FIPS_STATES[self._state.GetStringSelection()]),
                  'repeaterbook')
@@ -461,6 +596,7 @@ class DMRMARCQueryDialog(QuerySourceDialog):
         return 'https://www.dmr-marc.net'
 
     def do_query(self):
+        from chirp.sources import dmrmarc
         CONF.set('city', self._city.GetValue(), 'dmrmarc')
         CONF.set('state', self._state.GetValue(), 'dmrmarc')
         CONF.set('country', self._country.GetValue(), 'dmrmarc')
@@ -468,9 +604,9 @@ class DMRMARCQueryDialog(QuerySourceDialog):
         super().do_query()
 
     def get_params(self):
-        return {'city': CONF.get('city', 'dmrmarc'),
-                'state': CONF.get('state', 'dmrmarc'),
-                'country': CONF.get('country', 'dmrmarc')}
+        return {'city': self._city.GetValue(),
+                'state': self._state.GetValue(),
+                'country': self._country.GetValue()}
 
 
 class RRQueryDialog(QuerySourceDialog):
@@ -491,7 +627,9 @@ class RRQueryDialog(QuerySourceDialog):
         grid.Add(widget, 1, border=20, flag=wx.EXPAND | wx.RIGHT | wx.LEFT)
 
     def build(self):
-        self.result_radio = radioreference.RadioReferenceRadio()
+        from chirp.sources import radioreference
+        self._rr = radioreference
+        self.result_radio = self._rr.RadioReferenceRadio()
         self.tabs = wx.Notebook(self)
         vbox = wx.BoxSizer(wx.VERTICAL)
         self.SetSizer(vbox)
@@ -529,6 +667,12 @@ class RRQueryDialog(QuerySourceDialog):
 
         # build a new login button
         self._loginbutton = wx.Button(panel, id=wx.ID_OK, label='Log In')
+        self._login_thread = None
+        # Empty until login fetches the CA data, see _build_ca_index()
+        self._ca_prov_by_id = {}
+        self._ca_counties_by_prov = collections.defaultdict(list)
+        self._ca_county_by_id = {}
+        self._ca_county_id_by_name = {}
         grid.Add(self._loginbutton)
         self._loginbutton.Bind(wx.EVT_BUTTON, self._populateca)
 
@@ -545,7 +689,7 @@ class RRQueryDialog(QuerySourceDialog):
         grid.Add(wx.StaticText(panel, label=''),
                  border=20, flag=wx.ALIGN_CENTER | wx.RIGHT | wx.LEFT)
 
-        if radioreference.CA_PROVINCES:
+        if self._rr.CA_PROVINCES:
             self.populateprov()
 
         panel.SetSizer(grid)
@@ -565,21 +709,41 @@ class RRQueryDialog(QuerySourceDialog):
         return panel
 
     def _populateca(self, event):
-        def cb(result):
-            if isinstance(result, Exception):
-                self.status('Failed: %s' % result, 0)
-            else:
-                self.status('Logged in', 0)
-                wx.CallAfter(self.populateprov)
+        if self._login_thread and self._login_thread.is_alive():
+            return
+        self._loginbutton.Disable()
         self.status('Attempting login...', 0)
-        radioreference.RadioReferenceCAData(
-            cb,
+        self._login_thread = self._rr.RadioReferenceCAData(
+            lambda result: wx.CallAfter(self._finish_login, result),
             self._rrusername.GetValue(),
-            self._rrpassword.GetValue()).start()
+            self._rrpassword.GetValue())
+        self._login_thread.start()
+
+    def _finish_login(self, result):
+        if isinstance(result, Exception):
+            self.status('Failed: %s' % result, 0)
+            self._loginbutton.Enable()
+        else:
+            self.status('Logged in', 0)
+            self.populateprov()
+
+    def _build_ca_index(self):
+        # The CA data is only available after login, so index it here
+        # rather than scanning the lists on every selection change
+        self._ca_prov_by_id = {str(v): k for k, v in
+                               self._rr.CA_PROVINCES.items()}
+        self._ca_counties_by_prov = collections.defaultdict(list)
+        self._ca_county_by_id = {}
+        self._ca_county_id_by_name = {}
+        for _, prov, cid, county in self._rr.CA_COUNTIES:
+            self._ca_counties_by_prov[prov].append(county)
+            self._ca_county_by_id.setdefault(str(cid), county)
+            self._ca_county_id_by_name.setdefault(county, cid)
 
     def populateprov(self):
+        self._build_ca_index()
         self._provchoice.SetItems([str(x) for x in
-                                   radioreference.CA_PROVINCES.keys()])
+                                   self._rr.CA_PROVINCES.keys()])
         self.getconfdefaults()
         self._provchoice.SetStringSelection(self.default_prov)
         self._selected_province(self.default_prov)
@@ -589,19 +753,9 @@ class RRQueryDialog(QuerySourceDialog):
 
     def getconfdefaults(self):
         code = CONF.get("province", "radioreference")
-        for k, v in radioreference.CA_PROVINCES.items():
-            if code == str(v):
-                self.default_prov = k
-                break
-            else:
-                self.default_prov = "BC"
+        self.default_prov = self._ca_prov_by_id.get(code, "BC")
         code = CONF.get("county", "radioreference")
-        for row in radioreference.CA_COUNTIES:
-            if code == str(row[2]):
-                self.default_county = row[3]
-                break
-            else:
-                self.default_county = 0
+        self.default_county = self._ca_county_by_id.get(code, 0)
         LOG.debug('Default province=%r county=%r' % (self.default_prov,
                                                      self.default_county))
 
@@ -611,26 +765,19 @@ class RRQueryDialog(QuerySourceDialog):
     def _selected_province(self, chosenprov):
         # if user alters the province dropdown, load the new counties into
         # the county dropdown choice
-        for name, id in radioreference.CA_PROVINCES.items():
-            if name == chosenprov:
-                CONF.set_int('province', id, 'radioreference')
-                LOG.debug('Province id %s for %s' % (id, name))
-                break
-        self._countychoice.Clear()
-        for x in radioreference.CA_COUNTIES:
-            if x[1] == chosenprov:
-                self._countychoice.Append(x[3])
+        id = self._rr.CA_PROVINCES.get(chosenprov)
+        if id is not None:
+            CONF.set_int('province', id, 'radioreference')
+            LOG.debug('Province id %s for %s' % (id, chosenprov))
+        with wx.WindowUpdateLocker(self._countychoice):
+            self._countychoice.SetItems(self._ca_counties_by_prov[chosenprov])
         self._selected_county(self._countychoice.GetItems()[0])
 
     def selected_county(self, event):
         self._selected_county(self._countychoice.GetStringSelection())
 
     def _selected_county(self, chosencounty):
-        self._ca_county_id = 0
-        for _, prov, cid, county in radioreference.CA_COUNTIES:
-            if county == chosencounty:
-                self._ca_county_id = cid
-                break
+        self._ca_county_id = self._ca_county_id_by_name.get(chosencounty, 0)
         CONF.set_int('county', self._ca_county_id, 'radioreference')
         LOG.debug('County id %s for %s' % (self._ca_county_id, chosencounty))
 
@@ -648,7 +795,7 @@ class RRQueryDialog(QuerySourceDialog):
 
         if self.tabs.GetSelection() == 1:
             # CA
-            if not radioreference.CA_PROVINCES:
+            if not self._rr.CA_PROVINCES:
                 raise Exception(_('RadioReference Canada requires a login '
                                   'before you can query'))
 
@@ -0,0 +1,29 @@
+from unittest import mock
+
+from chirp.sources import radioreference
+from tests.unit import base
+
+
+class TestRadioReferenceCancel(base.BaseTest):
+    def test_cancel_between_subcats(self):
+        # Skip __init__, which needs suds and a live WSDL
+        radio = radioreference.RadioReferenceRadio.__new__(
+            radioreference.RadioReferenceRadio)
+        radio._auth = {}
+        radio._client = mock.MagicMock()
+        service = radio._client.service
+        cat = mock.MagicMock()
+        cat.subcats = [mock.MagicMock(), mock.MagicMock()]
+        county = service.getCountyInfo.return_value
+        county.cats = [cat]
+        county.agencyList = []
+        service.getSubcatFreqs.return_value = []
+
+        status = mock.MagicMock()
+        # User hits cancel after the first subcategory is fetched
+        status.is_cancelled.side_effect = [False, True]
+        radio.do_fetch(status, {'country': 'US', 'zipcounty': '97201'})
+
+        service.getSubcatFreqs.assert_called_once_with(
+            cat.subcats[0].scid, {})
+        status.send_end.assert_not_called()
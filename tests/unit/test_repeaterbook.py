@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from chirp.sources import repeaterbook
+from tests.unit import base as test_base
+
+
+class TestRepeaterBookCancel(test_base.BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.db_dir = os.path.join(self.tempdir, 'repeaterbook')
+        os.mkdir(self.db_dir)
+        platform = mock.MagicMock()
+        platform.config_file.return_value = self.db_dir
+        p = mock.patch('chirp.platform.get_platform',
+                       return_value=platform)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def test_cancel_during_download(self):
+        # Leave an expired cached copy that must survive the cancel
+        data_file = os.path.join(self.db_dir,
+                                 'rb-united_states-oregon.json')
+        with open(data_file, 'w') as f:
+            f.write('cached')
+        old = time.time() - 86400 * 60
+        os.utime(data_file, (old, old))
+
+        status = mock.MagicMock()
+        cancelled = []
+        status.is_cancelled.side_effect = lambda: bool(cancelled)
+
+        def chunks(chunk_size):
+            yield b'{"count": 1,'
+            # User hits cancel after the first chunk
+            cancelled.append(True)
+            yield b'"results": []}'
+
+        resp = mock.MagicMock()
+        resp.status_code = 200
+        resp.iter_content.side_effect = chunks
+        with mock.patch('requests.get', return_value=resp):
+            rb = repeaterbook.RepeaterBook()
+            self.assertIsNone(rb.get_data(status, 'United States',
+                                          'Oregon'))
+
+        resp.close.assert_called_once_with()
+        self.assertFalse(os.path.exists(data_file + '.tmp'))
+        with open(data_file) as f:
+            self.assertEqual('cached', f.read())
+        self.assertEqual(old, os.path.getmtime(data_file))
+        status.send_end.assert_not_called()
+        status.send_fail.assert_not_called()
@@ -0,0 +1,7 @@
+from chirp.sources import base
+from tests.unit import base as test_base
+
+
+class TestQueryStatus(test_base.BaseTest):
+    def test_not_cancelled(self):
+        self.assertFalse(base.QueryStatus().is_cancelled())
@@ -0,0 +1,46 @@
+import configparser
+import os
+import shutil
+import tempfile
+
+from chirp.wxui import config
+from tests.unit import base
+
+
+class TestChirpConfig(base.BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.conf = config.ChirpConfigProxy(
+            config.ChirpConfig(self.tempdir))
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def test_get_section_missing(self):
+        self.assertEqual({}, self.conf.get_section('foo'))
+
+    def test_get_section(self):
+        self.conf.set('lat', '45.5', 'foo')
+        self.conf.set('lon', '-122.5', 'foo')
+        self.conf.set('other', 'x', 'bar')
+        self.assertEqual({'lat': '45.5', 'lon': '-122.5'},
+                         self.conf.get_section('foo'))
+
+    def test_get_section_default(self):
+        conf = config.ChirpConfigProxy(config.ChirpConfig(self.tempdir),
+                                       'foo')
+        conf.set('lat', '45.5')
+        self.assertEqual({'lat': '45.5'}, conf.get_section())
+
+    def test_get_section_raw(self):
+        # set() refuses bare % values, but they can come from the file
+        with open(os.path.join(self.tempdir, 'chirp.config'), 'w') as f:
+            f.write('[foo]\npct = 50%\n')
+        self.conf = config.ChirpConfigProxy(
+            config.ChirpConfig(self.tempdir))
+        self.assertRaises(configparser.InterpolationSyntaxError,
+                          self.conf.get_section, 'foo')
+        self.assertEqual({'pct': '50%'},
+                         self.conf.get_section('foo', raw=True))
@@ -0,0 +1,79 @@
+import sys
+from unittest import mock
+
+sys.modules['wx'] = wx = mock.MagicMock()
+sys.modules['wx.adv'] = wx.adv
+
+
+class FakeWindow:
+    def __init__(self, *a, **k):
+        pass
+
+
+# These need to be real classes so that the dialogs and validators
+# subclassing them are real classes too
+wx.Validator = wx.Dialog = wx.Panel = FakeWindow
+wx.lib.newevent.NewCommandEvent.return_value = (mock.MagicMock(),
+                                                mock.MagicMock())
+wx.ID_OK = 5100
+wx.ID_CANCEL = 5101
+
+from tests.unit import base
+from chirp.wxui import query_sources
+
+
+class TestQueryThread(base.BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.dialog = mock.MagicMock()
+        self.thread = query_sources.QueryThread(self.dialog,
+                                                mock.MagicMock(), {})
+
+    def test_is_cancelled(self):
+        self.assertFalse(self.thread.is_cancelled())
+        self.thread.cancel_event.set()
+        self.assertTrue(self.thread.is_cancelled())
+
+    def test_send_before_cancel(self):
+        self.thread.send_status('Querying', 10)
+        self.thread.send_end()
+        self.thread.send_fail('oops')
+        self.dialog.status.assert_called_once_with('Querying', 10)
+        self.dialog.end.assert_called_once_with()
+        self.dialog.fail.assert_called_once_with('oops')
+
+    def test_send_after_cancel(self):
+        self.thread.cancel_event.set()
+        self.thread.send_status('Querying', 10)
+        self.thread.send_end()
+        self.thread.send_fail('oops')
+        self.dialog.status.assert_not_called()
+        self.dialog.end.assert_not_called()
+        self.dialog.fail.assert_not_called()
+
+
+class TestQuerySourceDialog(base.BaseTest):
+    def _make_dialog(self, query_thread):
+        dialog = query_sources.QuerySourceDialog.__new__(
+            query_sources.QuerySourceDialog)
+        dialog._query_thread = query_thread
+        dialog.EndModal = mock.MagicMock()
+        return dialog
+
+    def _event(self, id):
+        event = mock.MagicMock()
+        event.GetEventObject.return_value.GetId.return_value = id
+        return event
+
+    def test_cancel_sets_event(self):
+        thread = query_sources.QueryThread(mock.MagicMock(),
+                                           mock.MagicMock(), {})
+        dialog = self._make_dialog(thread)
+        dialog._button(self._event(wx.ID_CANCEL))
+        self.assertTrue(thread.is_cancelled())
+        dialog.EndModal.assert_called_once_with(wx.ID_CANCEL)
+
+    def test_cancel_without_query(self):
+        dialog = self._make_dialog(None)
+        dialog._button(self._event(wx.ID_CANCEL))
+        dialog.EndModal.assert_called_once_with(wx.ID_CANCEL)